@@ -15,6 +15,15 @@ class DatabaseConfig(BaseSettings):
     pool_recycle: int = Field(default=3600, description="连接池回收时间")
     echo: bool = Field(default=False, description="是否打印SQL语句")
 
+class ProfilingConfig(BaseSettings):
+    """性能分析配置"""
+    model_config = ConfigDict(env_prefix="PROFILE_")
+
+    enabled: bool = Field(default=False, description="是否为所有工具调用开启阶段耗时统计")
+    sampler: str = Field(default="none", description="慢调用采样方式: none / cprofile / tracemalloc")
+    top_n: int = Field(default=10, description="保留采样结果的最慢调用数量")
+    output_dir: str = Field(default="data/profiles", description="采样结果输出目录")
+
 class AppConfig(BaseSettings):
     """应用配置"""
     model_config = ConfigDict(env_prefix="APP_")
@@ -27,5 +36,8 @@ class AppConfig(BaseSettings):
     # 数据库配置
     database: DatabaseConfig = Field(default_factory=DatabaseConfig, description="数据库配置")
 
+    # 性能分析配置
+    profiling: ProfilingConfig = Field(default_factory=ProfilingConfig, description="性能分析配置")
+
 # 全局配置实例
 config = AppConfig()
\ No newline at end of file
@@ -5,7 +5,8 @@ src/mcp_datatools/database.py - 多数据库管理器
 from .utils import setup_project_path
 setup_project_path()
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from collections import deque
 from contextlib import contextmanager
 from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.exc import SQLAlchemyError
@@ -14,9 +15,13 @@ from mcp.server.fastmcp.utilities.logging import get_logger
 
 from config.settings import config
 from .utils import mask_password
+from .profiling import phase
 
 logger = get_logger(__name__)
 
+# 外键关系图缓存（按 database_url 缓存，避免重复的元数据查询）
+_fk_graph_cache: Dict[str, Dict[str, Any]] = {}
+
 class MultiDatabaseManager:
     """多数据库管理器"""
     
@@ -77,7 +82,8 @@ class MultiDatabaseManager:
         if not self.engine:
             raise RuntimeError("数据库未连接")
         
-        conn = self.engine.connect()
+        with phase("pool_checkout"):
+            conn = self.engine.connect()
         try:
             yield conn
         finally:
@@ -133,7 +139,7 @@ class MultiDatabaseManager:
     def get_table_names(self) -> List[str]:
         """获取数据库中的所有表名"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection() as conn, phase("database"):
                 inspector = inspect(conn)
                 table_names = inspector.get_table_names()
                 return table_names
@@ -168,7 +174,7 @@ class MultiDatabaseManager:
     def get_table_schema(self, table_name: str) -> Dict[str, Any]:
         """获取指定表的详细结构信息"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection() as conn, phase("database"):
                 inspector = inspect(conn)
                 
                 # 验证表是否存在
@@ -214,6 +220,133 @@ class MultiDatabaseManager:
             logger.error(f"获取表结构信息失败: {e}")
             raise
     
+    def get_foreign_key_graph(self, refresh: bool = False) -> Dict[str, Any]:
+        """获取整库外键关系图（邻接表 + 预计算的最短关联路径），结果按URL缓存"""
+        if not refresh and self.database_url in _fk_graph_cache:
+            return _fk_graph_cache[self.database_url]
+
+        try:
+            with self.get_connection() as conn, phase("database"):
+                inspector = inspect(conn)
+                table_names = inspector.get_table_names()
+                # 一次批量读取所有表的外键，避免逐表查询
+                multi_fks = inspector.get_multi_foreign_keys()
+        except Exception as e:
+            logger.error(f"获取外键关系图失败: {e}")
+            raise
+
+        # 邻接表：表 -> {相邻表: [连接条件, ...]}，每条外键对应一个连接条件
+        # condition 用于展示，quoted_condition 按方言转义标识符，可直接写入SQL
+        quote = self.engine.dialect.identifier_preparer.quote
+        adjacency: Dict[str, Dict[str, List[Dict[str, str]]]] = {name: {} for name in table_names}
+        edge_count = 0
+        for (schema, table_name), foreign_keys in multi_fks.items():
+            for fk in foreign_keys:
+                ref_table = fk.get("referred_table")
+                if not ref_table or ref_table == table_name:
+                    # 自引用外键不参与表间路径
+                    continue
+                ref_schema = fk.get("referred_schema")
+                if ref_schema is not None and ref_schema != schema:
+                    # 跨 schema 的外键不在当前关系图内，避免与同名表混淆
+                    continue
+                column_pairs = list(zip(fk["constrained_columns"], fk["referred_columns"]))
+                condition = {
+                    "condition": " AND ".join(
+                        f"{table_name}.{local_col} = {ref_table}.{ref_col}"
+                        for local_col, ref_col in column_pairs
+                    ),
+                    "quoted_condition": " AND ".join(
+                        f"{quote(table_name)}.{quote(local_col)} = {quote(ref_table)}.{quote(ref_col)}"
+                        for local_col, ref_col in column_pairs
+                    ),
+                }
+                adjacency.setdefault(table_name, {}).setdefault(ref_table, []).append(condition)
+                adjacency.setdefault(ref_table, {}).setdefault(table_name, []).append(condition)
+                edge_count += 1
+
+        # 对每个表做一次BFS，记录最短路径上的前驱节点
+        parents: Dict[str, Dict[str, Optional[str]]] = {}
+        for source in adjacency:
+            visited: Dict[str, Optional[str]] = {source: None}
+            queue = deque([source])
+            while queue:
+                current = queue.popleft()
+                for neighbor in sorted(adjacency[current]):
+                    if neighbor not in visited:
+                        visited[neighbor] = current
+                        queue.append(neighbor)
+            parents[source] = visited
+
+        graph = {
+            "tables": sorted(adjacency),
+            "adjacency": adjacency,
+            "parents": parents,
+            "edge_count": edge_count,
+        }
+        _fk_graph_cache[self.database_url] = graph
+        logger.info(f"已构建外键关系图: {len(adjacency)} 个表, {edge_count} 条外键")
+        return graph
+
+    @staticmethod
+    def _shortest_path(graph: Dict[str, Any], source: str, target: str) -> Optional[List[str]]:
+        """根据预计算的前驱节点还原最短关联路径"""
+        visited = graph["parents"].get(source, {})
+        if target not in visited:
+            return None
+        path = [target]
+        while path[-1] != source:
+            path.append(visited[path[-1]])
+        path.reverse()
+        return path
+
+    def find_join_path(self, table_names: List[str], refresh: bool = False) -> Dict[str, Any]:
+        """根据外键关系图计算连接多个表的关联路径及连接条件"""
+        tables = list(dict.fromkeys(name.strip() for name in table_names if name and name.strip()))
+        if len(tables) < 2:
+            raise ValueError("至少需要提供两个不同的表名")
+
+        graph = self.get_foreign_key_graph(refresh)
+        missing = [name for name in tables if name not in graph["adjacency"]]
+        if missing:
+            raise ValueError(f"表不存在: {', '.join(missing)}")
+
+        quote = self.engine.dialect.identifier_preparer.quote
+
+        # 从第一个表出发，依次把距离已连接部分最近的路径并入
+        connected = [tables[0]]
+        joins = []
+        for target in tables[1:]:
+            if target in connected:
+                continue
+            best_path = None
+            for source in connected:
+                path = self._shortest_path(graph, source, target)
+                if path and (best_path is None or len(path) < len(best_path)):
+                    best_path = path
+            if best_path is None:
+                raise ValueError(f"表 '{target}' 与 {', '.join(connected)} 之间不存在外键关联路径")
+
+            for left, right in zip(best_path, best_path[1:]):
+                if right in connected:
+                    continue
+                conditions = graph["adjacency"][left][right]
+                joins.append({
+                    "left_table": left,
+                    "right_table": right,
+                    "quoted_right_table": quote(right),
+                    "condition": conditions[0]["condition"],
+                    "quoted_condition": conditions[0]["quoted_condition"],
+                    "alternatives": [c["condition"] for c in conditions[1:]],
+                })
+                connected.append(right)
+
+        return {
+            "tables": connected,
+            "quoted_first_table": quote(connected[0]),
+            "joins": joins,
+        }
+
     def _validate_query(self, query: str) -> None:
         """验证查询安全性"""
         query_upper = query.upper().strip()
@@ -245,28 +378,32 @@ class MultiDatabaseManager:
     def execute_query(self, query: str, params: dict = None) -> List[Dict[str, Any]]:
         """安全执行SQL查询"""
         try:
-            # 验证查询安全性
-            self._validate_query(query)
-            
-            # 添加默认限制
-            limited_query = self._add_limit_to_query(query, config.max_query_results)
+            with phase("sql_validation"):
+                # 验证查询安全性
+                self._validate_query(query)
+                
+                # 添加默认限制
+                limited_query = self._add_limit_to_query(query, config.max_query_results)
             
             with self.get_connection() as conn:
-                if params:
-                    # 使用参数化查询
-                    result = conn.execute(text(limited_query), params)
-                else:
-                    # 直接执行查询
-                    result = conn.execute(text(limited_query))
-                
-                # 获取列名
-                columns = result.keys()
+                with phase("database"):
+                    if params:
+                        # 使用参数化查询
+                        result = conn.execute(text(limited_query), params)
+                    else:
+                        # 直接执行查询
+                        result = conn.execute(text(limited_query))
+                    
+                    # 获取列名，并在此阶段取回全部结果行
+                    columns = result.keys()
+                    fetched = result.fetchall()
                 
-                # 转换为字典列表
-                rows = []
-                for row in result:
-                    row_dict = dict(zip(columns, row))
-                    rows.append(row_dict)
+                with phase("row_conversion"):
+                    # 转换为字典列表
+                    rows = []
+                    for row in fetched:
+                        row_dict = dict(zip(columns, row))
+                        rows.append(row_dict)
                 
                 return rows
                 
@@ -0,0 +1,240 @@
+"""
+src/mcp_datatools/profiling.py - 工具调用性能分析（阶段耗时统计与慢调用采样）
+"""
+
+from .utils import setup_project_path
+setup_project_path()
+
+import os
+import time
+import heapq
+import cProfile
+import threading
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+from contextlib import nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from mcp.server.fastmcp.utilities.logging import get_logger
+
+from config.settings import config
+
+logger = get_logger(__name__)
+
+# 阶段名称（按调用链顺序），未覆盖的耗时计入 other
+PHASES = [
+    "engine_setup",
+    "pool_checkout",
+    "sql_validation",
+    "database",
+    "row_conversion",
+    "output_formatting",
+]
+
+# 当前调用的记录；未开启分析时为 None，phase() 直接返回空上下文
+_current_record: ContextVar[Optional["CallRecord"]] = ContextVar("profiling_record", default=None)
+_NULL_PHASE = nullcontext()
+
+# 聚合统计：工具名 -> {"calls", "total", "max", "phases"}
+_stats: Dict[str, Dict[str, Any]] = {}
+# 最慢调用的小顶堆：(耗时, 序号, 调用摘要)
+_slowest: List[tuple] = []
+_stats_lock = threading.Lock()
+# cProfile / tracemalloc 同一时间只能服务一个调用
+_sampler_lock = threading.Lock()
+_call_seq = 0
+
+class CallRecord:
+    """单次工具调用的阶段耗时记录"""
+    __slots__ = ("tool_name", "phases")
+
+    def __init__(self, tool_name: str):
+        self.tool_name = tool_name
+        self.phases: Dict[str, float] = {}
+
+class _PhaseTimer:
+    """阶段计时器，同一阶段多次进入时累加耗时"""
+    __slots__ = ("_record", "_name", "_start")
+
+    def __init__(self, record: CallRecord, name: str):
+        self._record = record
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        phases = self._record.phases
+        phases[self._name] = phases.get(self._name, 0.0) + elapsed
+        return False
+
+def phase(name: str):
+    """为当前调用的某个阶段计时；未开启分析时几乎没有开销"""
+    record = _current_record.get()
+    if record is None:
+        return _NULL_PHASE
+    return _PhaseTimer(record, name)
+
+def _resolve_output_dir() -> str:
+    """解析采样输出目录，相对路径以项目根目录为基准"""
+    output_dir = config.profiling.output_dir
+    if not os.path.isabs(output_dir):
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        project_root = os.path.dirname(os.path.dirname(current_dir))
+        output_dir = os.path.join(project_root, output_dir)
+    return output_dir
+
+def _start_sampler(sampler: str) -> Optional[Any]:
+    """启动采样器；采样器被其他调用占用或启动失败时返回 None"""
+    if sampler not in ("cprofile", "tracemalloc"):
+        return None
+    if not _sampler_lock.acquire(blocking=False):
+        return None
+    try:
+        if sampler == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        if tracemalloc.is_tracing():
+            _sampler_lock.release()
+            return None
+        tracemalloc.start()
+        return "tracemalloc"
+    except Exception as e:
+        logger.warning(f"启动性能采样失败: {e}")
+        _sampler_lock.release()
+        return None
+
+def _stop_sampler(handle: Any) -> Optional[Any]:
+    """停止采样器并返回采样数据"""
+    try:
+        if isinstance(handle, cProfile.Profile):
+            handle.disable()
+            return handle
+        # 工具返回时临时对象已释放，逐行快照只剩残留对象，因此只记录内存总量
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return current, peak
+    finally:
+        _sampler_lock.release()
+
+def _write_sample(tool_name: str, seq: int, elapsed: float, sample: Any) -> Optional[str]:
+    """将采样数据写入输出目录"""
+    output_dir = _resolve_output_dir()
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    base_name = f"{stamp}_{seq}_{tool_name}_{elapsed * 1000:.0f}ms"
+
+    if isinstance(sample, cProfile.Profile):
+        path = os.path.join(output_dir, f"{base_name}.prof")
+        sample.dump_stats(path)
+        return path
+
+    current, peak = sample
+    path = os.path.join(output_dir, f"{base_name}.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"工具: {tool_name}\n耗时: {elapsed * 1000:.2f} ms\n")
+        f.write(f"内存峰值: {peak / 1024:.1f} KiB\n调用结束时仍占用: {current / 1024:.1f} KiB\n")
+    return path
+
+def _record_call(record: CallRecord, elapsed: float, sample: Any) -> None:
+    """把一次调用并入聚合统计，并只为最慢的 top_n 个调用保留采样文件"""
+    global _call_seq
+    top_n = max(config.profiling.top_n, 0)
+
+    with _stats_lock:
+        _call_seq += 1
+        seq = _call_seq
+
+        stats = _stats.setdefault(record.tool_name, {"calls": 0, "total": 0.0, "max": 0.0, "phases": {}})
+        stats["calls"] += 1
+        stats["total"] += elapsed
+        stats["max"] = max(stats["max"], elapsed)
+        for name, value in record.phases.items():
+            stats["phases"][name] = stats["phases"].get(name, 0.0) + value
+        stats["phases"]["other"] = stats["phases"].get("other", 0.0) + max(elapsed - sum(record.phases.values()), 0.0)
+
+        # 判断本次调用是否进入最慢的 top_n
+        if top_n == 0 or (len(_slowest) >= top_n and elapsed <= _slowest[0][0]):
+            return
+
+        entry = {"tool": record.tool_name, "elapsed": elapsed, "phases": dict(record.phases), "profile_path": None}
+        evicted = None
+        if len(_slowest) < top_n:
+            heapq.heappush(_slowest, (elapsed, seq, entry))
+        else:
+            _, _, evicted = heapq.heapreplace(_slowest, (elapsed, seq, entry))
+            evicted["evicted"] = True
+
+    # 文件读写不占用统计锁
+    if evicted and evicted["profile_path"]:
+        _remove_sample(evicted["profile_path"])
+
+    if sample is None:
+        return
+    try:
+        path = _write_sample(record.tool_name, seq, elapsed, sample)
+    except Exception as e:
+        logger.warning(f"写入性能采样文件失败: {e}")
+        return
+
+    with _stats_lock:
+        # 写文件期间本次调用可能已被挤出 top_n
+        still_kept = not entry.get("evicted")
+        if still_kept:
+            entry["profile_path"] = path
+    if not still_kept:
+        _remove_sample(path)
+
+def _remove_sample(path: str) -> None:
+    """删除不再保留的采样文件"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def profile_tool(tool_name: str):
+    """工具性能分析装饰器：全局配置开启或调用时传入 profile=True 时记录阶段耗时"""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs) -> Any:
+            if not (config.profiling.enabled or kwargs.get("profile")):
+                return func(*args, **kwargs)
+
+            record = CallRecord(tool_name)
+            token = _current_record.set(record)
+            handle = _start_sampler(config.profiling.sampler)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                sample = _stop_sampler(handle) if handle is not None else None
+                _current_record.reset(token)
+                _record_call(record, elapsed, sample)
+        return wrapper
+    return decorator
+
+def get_profiling_stats() -> Dict[str, Any]:
+    """获取聚合后的阶段耗时统计和最慢调用列表"""
+    with _stats_lock:
+        tools = {
+            name: {
+                "calls": stats["calls"],
+                "total": stats["total"],
+                "max": stats["max"],
+                "phases": dict(stats["phases"]),
+            }
+            for name, stats in _stats.items()
+        }
+        slowest = [dict(entry) for _, _, entry in sorted(_slowest, reverse=True)]
+    return {"tools": tools, "slowest": slowest}
+
+def reset_profiling_stats() -> None:
+    """清空聚合统计（已写入磁盘的采样文件保留）"""
+    with _stats_lock:
+        _stats.clear()
+        _slowest.clear()